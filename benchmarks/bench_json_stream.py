@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark: parseo completo vs parseo incremental de respuestas grandes de Odoo
+Uso: python benchmarks/bench_json_stream.py
+"""
+import json
+import sys
+import time
+from pathlib import Path
+
+# Agregar raíz del proyecto al path para imports
+sys.path.insert(0, str(Path(__file__).parent.parent.absolute()))
+
+from services.json_stream import JSON_BACKEND, StreamingJsonObject, loads, preview_json
+
+CHUNK_SIZE = 64 * 1024  # Tamaño típico de fragmento de httpx
+REPEAT = 5
+
+
+def build_payload(n_contracts: int) -> dict:
+    """Respuesta sintética de DetailContract con n contratos"""
+    return {
+        "success": True,
+        "data": [
+            {
+                "contract_id": f"CT-{i:06d}",
+                "client_name": "Empresa Ejemplo S.A.C.",
+                "status": "activo" if i % 3 else "suspendido",
+                "start_date": "2023-01-15",
+                "services": [{"service_id": i * 10 + j, "product": "Internet Dedicado 100Mbps"} for j in range(5)],
+                "notes": "Observación " * 20,
+            }
+            for i in range(n_contracts)
+        ],
+    }
+
+
+def best_of(fn) -> float:
+    times = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def full_parse_json(body: bytes):
+    return json.loads(body)
+
+
+def full_parse(body: bytes):
+    return loads(body)
+
+
+def stream_parse(body: bytes):
+    parser = StreamingJsonObject(max_items=3)
+    for i in range(0, len(body), CHUNK_SIZE):
+        if parser.feed(body[i:i + CHUNK_SIZE]):
+            break
+    return parser.close()
+
+
+def main():
+    print(f"Backend JSON: {JSON_BACKEND}")
+    # "completo" usa el mismo backend que "stream" para aislar el corte temprano
+    print(f"{'contratos':>10} {'tamaño':>10} {'json':>10} {'completo':>10} {'stream':>10} {'dumps':>10} {'preview':>10}")
+    for n in (100, 1_000, 10_000, 50_000):
+        payload = build_payload(n)
+        body = json.dumps(payload).encode()
+
+        t_json = best_of(lambda: full_parse_json(body))
+        t_full = best_of(lambda: full_parse(body))
+        t_stream = best_of(lambda: stream_parse(body))
+        t_dumps = best_of(lambda: json.dumps(payload, indent=2, ensure_ascii=False)[:1500])
+        t_preview = best_of(lambda: preview_json(payload, 1500))
+
+        assert stream_parse(body)["data"] == loads(body)["data"][:3]
+        assert preview_json(payload, 1500) == json.dumps(payload, indent=2, ensure_ascii=False)[:1500]
+
+        print(f"{n:>10} {len(body) / 1024 / 1024:>8.1f}MB "
+              f"{t_json * 1000:>8.2f}ms {t_full * 1000:>8.2f}ms {t_stream * 1000:>8.2f}ms "
+              f"{t_dumps * 1000:>8.2f}ms {t_preview * 1000:>8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
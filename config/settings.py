@@ -27,6 +27,18 @@ class Settings:
     bcp_api_url: str = os.getenv("BCP_API_URL", "https://api.fiberlux.pe/bcp/api/v1")
     bbva_api_url: str = os.getenv("BBVA_API_URL", "https://apibco.fiberlux.pe/ce/bbva/v1")
     
+    # Espejo local de Odoo (SQLite)
+    odoo_mirror_enabled: bool = os.getenv("ODOO_MIRROR_ENABLED", "true").lower() == "true"
+    odoo_sync_interval: int = int(os.getenv("ODOO_SYNC_INTERVAL", "900"))  # segundos entre syncs
+    odoo_sync_batch: int = int(os.getenv("ODOO_SYNC_BATCH", "100"))  # filas por sync
+    odoo_sync_max_failures: int = int(os.getenv("ODOO_SYNC_MAX_FAILURES", "3"))  # fallas seguidas antes de cortar
+    odoo_volatile_max_age: int = int(os.getenv("ODOO_VOLATILE_MAX_AGE", "300"))  # segundos (estado, cobranza)
+    odoo_stable_max_age: int = int(os.getenv("ODOO_STABLE_MAX_AGE", "86400"))  # segundos (nombre, dirección...)
+    odoo_mirror_retention_days: int = int(os.getenv("ODOO_MIRROR_RETENTION_DAYS", "7"))  # sin lecturas
+    
+    # Consulta masiva (CSV/XLSX)
+    bulk_concurrency: int = int(os.getenv("BULK_CONCURRENCY", "8"))  # consultas simultáneas
+    
     # App
     log_level: str = os.getenv("LOG_LEVEL", "INFO")
     timezone: str = os.getenv("TIMEZONE", "America/Lima")
@@ -36,10 +48,11 @@ class Settings:
     data_dir: Path = BASE_DIR / "data"
     logs_dir: Path = BASE_DIR / "logs"
     audio_dir: Path = BASE_DIR / "audio"
+    bulk_dir: Path = BASE_DIR / "data" / "bulk"
     
     def __init__(self):
         # Crear directorios
-        for directory in [self.data_dir, self.logs_dir, self.audio_dir]:
+        for directory in [self.data_dir, self.logs_dir, self.audio_dir, self.bulk_dir]:
             directory.mkdir(exist_ok=True, parents=True)
 
 # Instancia global
@@ -0,0 +1,238 @@
+from telegram import Update
+from telegram.ext import ContextTypes
+from services.odoo_client import OdooClient
+import asyncio
+import csv
+import json
+import logging
+import re
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterator, List
+
+from openpyxl import load_workbook
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_COLUMNS = ["fila", "id", "tipo", "estado", "contratos", "deuda", "error"]
+PROGRESS_INTERVAL = 3.0  # segundos entre ediciones del mensaje de progreso
+INVALID_ID = "ID inválido"
+
+_ID_LABEL = re.compile(r'^(RUC|DNI|ID)\s*[:#]?\s*', re.IGNORECASE)
+_ID_SEPARATORS = re.compile(r'[\s.\-]')
+_DECIMAL_ZERO = re.compile(r'\.0+$')
+
+
+def normalize_id(raw: str) -> str:
+    """Lleva un ID a solo dígitos; devuelve "" si no es un ID válido
+
+    Acepta formatos comunes de planilla: ``20514326062.0``,
+    ``20.514.326.062``, ``RUC 20514326062``, espacios o guiones. Un valor de
+    7 dígitos se toma como DNI al que Excel le quitó el cero inicial (pasa
+    igual en XLSX y en CSV exportado), así que un ID de servicio de 7
+    dígitos se consulta como DNI.
+    """
+    value = _ID_LABEL.sub("", raw.strip())
+    value = _DECIMAL_ZERO.sub("", value)
+    value = _ID_SEPARATORS.sub("", value)
+    if not value.isdigit():
+        return ""
+    if len(value) == 7:
+        value = "0" + value
+    return value
+
+
+def iter_ids(path: Path) -> Iterator[str]:
+    """Recorre la primera columna de un CSV/XLSX fila por fila, sin cargarlo entero"""
+    if path.suffix.lower() == ".xlsx":
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            for row in workbook.active.iter_rows(values_only=True):
+                value = row[0] if row else None
+                if isinstance(value, float) and value.is_integer():
+                    value = int(value)  # Excel guarda los RUC como números
+                yield "" if value is None else str(value).strip()
+        finally:
+            workbook.close()
+    else:
+        # CSV de Excel en Windows suele venir en cp1252; solo interesan los dígitos
+        with open(path, newline="", encoding="utf-8-sig", errors="replace") as f:
+            sample = f.read(4096)
+            f.seek(0)
+            try:
+                dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+            except csv.Error:
+                dialect = csv.excel
+            for row in csv.reader(f, dialect):
+                yield row[0].strip() if row else ""
+
+
+class BulkLookupHandler:
+    """Consulta masiva de RUC/DNI o IDs de servicio desde un archivo CSV/XLSX"""
+
+    def __init__(self, odoo_client: OdooClient):
+        from config.settings import settings
+
+        self.odoo = odoo_client
+        self.concurrency = settings.bulk_concurrency
+        self.work_dir = settings.bulk_dir
+
+    async def handle_document(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Procesar un archivo subido y devolver el resultado como CSV
+
+        Se registra con ``block=False`` para no frenar las demás conversaciones
+        mientras dura la consulta masiva.
+        """
+        document = update.message.document
+        suffix = Path(document.file_name or "").suffix.lower()
+        if suffix not in (".csv", ".xlsx"):
+            await update.message.reply_text("❌ Envía un archivo `.csv` o `.xlsx` con los RUC/DNI en la primera columna", parse_mode='Markdown')
+            return
+
+        # Parámetros opcionales en el caption: empresa y moneda, ej. "5 USD"
+        caption = (update.message.caption or "").upper()
+        companies = re.findall(r'\b\d+\b', caption)
+        company_id = companies[0] if companies else "5"
+        moneda = "USD" if "USD" in caption else "PEN"
+
+        job_id = uuid.uuid4().hex[:8]
+        input_path = self.work_dir / f"{job_id}_entrada{suffix}"
+        output_path = self.work_dir / f"{job_id}_resultado.csv"
+
+        status = await update.message.reply_text(f"📥 Recibido {document.file_name}. Preparando consulta masiva...")
+
+        try:
+            file = await document.get_file()
+            await file.download_to_drive(input_path)
+
+            async def progress(done: int, elapsed: float):
+                rate = done / elapsed if elapsed else 0
+                try:
+                    await status.edit_text(f"⏳ Procesadas {done} filas ({rate:.1f} filas/s)...")
+                except Exception as e:
+                    logger.debug(f"No se pudo actualizar progreso: {e}")
+
+            stats = await self.run_pipeline(iter_ids(input_path), company_id, moneda, output_path, progress)
+
+            rate = stats["rows"] / stats["elapsed"] if stats["elapsed"] else 0
+            summary = (
+                f"✅ Consulta masiva terminada\n\n"
+                f"• Filas: {stats['rows']}\n"
+                f"• Con error: {stats['errors']}\n"
+                f"• Omitidas: {stats['skipped']}\n"
+                f"• Tiempo: {stats['elapsed']:.1f}s ({rate:.1f} filas/s)"
+            )
+            await status.edit_text(summary)
+            with open(output_path, "rb") as f:
+                await update.message.reply_document(f, filename=f"resultado_{Path(document.file_name).stem}.csv")
+            logger.info(f"Consulta masiva {job_id}: {stats['rows']} filas en {stats['elapsed']:.1f}s ({rate:.1f} filas/s)")
+
+        except Exception as e:
+            logger.error(f"Error en consulta masiva {job_id}: {e}")
+            await status.edit_text(f"❌ Error en consulta masiva: {str(e)[:100]}")
+        finally:
+            input_path.unlink(missing_ok=True)
+            output_path.unlink(missing_ok=True)
+
+    async def run_pipeline(self, ids: Iterator[str], company_id: str, moneda: str, output_path: Path,
+                           progress: Callable[[int, float], Awaitable[None]]) -> Dict[str, Any]:
+        """Consulta los IDs con concurrencia acotada y escribe cada resultado al llegar
+
+        Las colas son acotadas, así que la memoria no depende del tamaño del
+        archivo. Las filas de salida pueden quedar en otro orden que la
+        entrada; la columna ``fila`` indica su posición original.
+        """
+        pending: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        results: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        stats = {"rows": 0, "errors": 0, "skipped": 0, "elapsed": 0.0}
+        start = time.monotonic()
+
+        async def producer():
+            for fila, raw in enumerate(ids, 1):
+                value = normalize_id(raw)
+                if value:
+                    await pending.put((fila, value))
+                elif not raw or fila == 1:
+                    stats["skipped"] += 1  # Filas vacías y encabezado
+                else:
+                    # Queda en el resultado para que se vea qué fila falló
+                    await results.put([fila, raw, "", "", "", "", INVALID_ID])
+            for _ in range(self.concurrency):
+                await pending.put(None)
+
+        async def worker():
+            while True:
+                item = await pending.get()
+                if item is None:
+                    break
+                fila, value = item
+                await results.put(await self.lookup(fila, value, company_id, moneda))
+
+        async def writer():
+            last_progress = start
+            with open(output_path, "w", newline="", encoding="utf-8") as f:
+                out = csv.writer(f)
+                out.writerow(OUTPUT_COLUMNS)
+                while True:
+                    row = await results.get()
+                    if row is None:
+                        break
+                    out.writerow(row)
+                    stats["rows"] += 1
+                    if row[-1]:
+                        stats["errors"] += 1
+                    now = time.monotonic()
+                    if now - last_progress >= PROGRESS_INTERVAL:
+                        f.flush()
+                        last_progress = now
+                        await progress(stats["rows"], now - start)
+
+        worker_tasks = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+
+        async def close_results():
+            await asyncio.gather(*worker_tasks)
+            await results.put(None)
+
+        # Si cualquier etapa falla (lectura, consulta o escritura) se cancelan
+        # las demás y el error llega al llamador, en vez de quedar tareas
+        # bloqueadas en una cola que nadie vacía
+        tasks = [asyncio.create_task(producer()), *worker_tasks,
+                 asyncio.create_task(close_results()), asyncio.create_task(writer())]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        stats["elapsed"] = time.monotonic() - start
+        return stats
+
+    async def lookup(self, fila: int, value: str, company_id: str, moneda: str) -> List[Any]:
+        """Consulta un ID ya normalizado: RUC/DNI (8-11 dígitos) o ID de servicio"""
+        try:
+            if 8 <= len(value) <= 11:
+                # Una llamada a la vez por worker: BULK_CONCURRENCY es el máximo real en vuelo
+                contratos = await self.odoo.listar_contratos(company_id, value, max_items=None, use_mirror=False)
+                deuda = await self.odoo.consultar_deuda_bcp(value, moneda)
+                errors = [r["error"] for r in (contratos, deuda) if isinstance(r, dict) and "error" in r]
+                contracts = contratos.get("data", contratos.get("contracts", [])) if isinstance(contratos, dict) else []
+                contracts = contracts if isinstance(contracts, list) else []
+                estados = sorted({str(c["status"]) for c in contracts if isinstance(c, dict) and c.get("status")})
+                debt = deuda.get("data", deuda.get("debt", deuda)) if isinstance(deuda, dict) and "error" not in deuda else ""
+                return [fila, value, "cliente", ", ".join(estados), len(contracts),
+                        json.dumps(debt, ensure_ascii=False) if debt else "", "; ".join(errors)]
+
+            servicio = await self.odoo.consultar_servicios(company_id, value, use_mirror=False)
+            if not servicio.get("success"):
+                return [fila, value, "servicio", "", "", "", servicio.get("error", "Error desconocido")]
+            detail = servicio.get("result") or {}
+            estado = detail.get("status_service", "") if isinstance(detail, dict) else ""
+            return [fila, value, "servicio", estado, "", "", ""]
+
+        except Exception as e:
+            logger.error(f"Error consultando fila {fila} ({value}): {e}")
+            return [fila, value, "", "", "", "", str(e)[:200]]
@@ -1,4 +1,5 @@
 from handlers.voice_handler import VoiceHandler
+from handlers.bulk_handler import BulkLookupHandler
 from services.whisper_service import WhisperService
 import logging
 import re
@@ -20,11 +21,15 @@ class TelegramBot:
     
     def __init__(self):
         self.application = None
+        from config.settings import settings
         from services.odoo_client import OdooClient
-        self.odoo_client = OdooClient()
+        from services.odoo_mirror import OdooMirror
+        self.odoo_mirror = OdooMirror() if settings.odoo_mirror_enabled else None
+        self.odoo_client = OdooClient(mirror=self.odoo_mirror)
         
         self.whisper_service = WhisperService(model_name="base")
         self.voice_handler = VoiceHandler(self.whisper_service)
+        self.bulk_handler = BulkLookupHandler(self.odoo_client)
         
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handler para /start"""
@@ -50,6 +55,8 @@ Conectado a las APIs de Fiberlux. Puedo ayudarte con:
 `/deuda_bcp 20514326062`
 
 También puedes escribir: "consulta servicio 8812"
+
+📎 Envía un CSV/XLSX con RUC/DNI para consulta masiva
 """
         await update.message.reply_text(welcome, parse_mode='Markdown')
         
@@ -73,6 +80,9 @@ También puedes escribir: "consulta servicio 8812"
 *Formas de usar:*
 1. Comandos directos: `/servicio 8812`
 2. Texto natural: "consulta el servicio 8812"
+3. Archivo CSV/XLSX: RUC/DNI o IDs de servicio en la primera columna
+   (7 dígitos se toman como DNI sin el cero inicial)
+   (caption opcional: `[empresa] [PEN/USD]`)
 """
         await update.message.reply_text(help_text, parse_mode='Markdown')
     
@@ -222,6 +232,15 @@ También puedes escribir: "consulta servicio 8812"
                 "O usa los comandos: /servicio, /contrato, /deuda_bcp"
             )
     
+    async def sync_mirror_job(self, context: ContextTypes.DEFAULT_TYPE):
+        """Job periódico: sincroniza el espejo local con Odoo"""
+        try:
+            stats = await self.odoo_mirror.sync(self.odoo_client)
+            logger.info(f"🗄️ Espejo sincronizado: {stats['services']} servicios, {stats['contracts']} contratos, "
+                        f"{stats['failed']} fallidos, {stats['evicted']} descartados")
+        except Exception as e:
+            logger.error(f"Error sincronizando espejo: {e}")
+    
     async def setup_commands(self):
         """Configurar comandos del bot"""
         commands = [
@@ -268,6 +287,22 @@ También puedes escribir: "consulta servicio 8812"
             self.application.add_handler(MessageHandler(filters.VOICE & ~filters.COMMAND, self.voice_handler.handle_voice_message))
         
         
+            # Consulta masiva desde archivos
+            self.application.add_handler(MessageHandler(
+                filters.Document.FileExtension("csv") | filters.Document.FileExtension("xlsx"),
+                self.bulk_handler.handle_document,
+                block=False
+            ))
+            
+            # Sincronización periódica del espejo local
+            if self.odoo_mirror:
+                self.application.job_queue.run_repeating(
+                    self.sync_mirror_job,
+                    interval=settings.odoo_sync_interval,
+                    first=30,
+                    name="odoo_mirror_sync"
+                )
+            
             # Configurar comandos en UI
             await self.setup_commands()
             
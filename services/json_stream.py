@@ -0,0 +1,224 @@
+import json
+import re
+from typing import Any, Iterable, Optional
+
+# Backend JSON rápido si está disponible (orjson), si no la librería estándar
+try:
+    import orjson
+
+    def loads(raw: bytes) -> Any:
+        return orjson.loads(raw)
+
+    JSON_BACKEND = "orjson"
+except ImportError:  # pragma: no cover - depende del entorno
+    def loads(raw: bytes) -> Any:
+        return json.loads(raw)
+
+    JSON_BACKEND = "json"
+
+_WHITESPACE = b" \t\r\n"
+_STRUCTURAL = re.compile(rb'["\[\]{}]')
+_STRING_END = re.compile(rb'["\\]')
+_SCALAR_END = re.compile(rb'[,\]}\s]')
+
+_PREVIEW_ENCODER = json.JSONEncoder(indent=2, ensure_ascii=False)
+
+
+class StreamingJsonObject:
+    """Parser incremental para el objeto JSON de una respuesta de Odoo.
+
+    Recibe el cuerpo por fragmentos con ``feed`` y va armando el diccionario
+    de nivel superior. Los arreglos bajo ``array_keys`` se decodifican
+    elemento por elemento: al aparecer un elemento más allá de ``max_items``
+    se marca ``truncated`` y ``feed`` devuelve True para que el llamador deje
+    de leer. Si el cuerpo no es un objeto se acumula completo y se decodifica
+    en ``close``.
+    """
+
+    def __init__(self, array_keys: Iterable[str] = ("data", "contracts"), max_items: Optional[int] = None):
+        self.array_keys = set(array_keys)
+        self.max_items = max_items
+        self.result: Any = {}
+        self.truncated = False
+        self.done = False
+        self._buf = bytearray()
+        self._pos = 0
+        self._state = "start"
+        self._key: Optional[str] = None
+        self._items: list = []
+        # Escaneo del valor en curso: inicio, posición, profundidad y si está dentro de un string
+        self._value_start = -1
+        self._scan_pos = 0
+        self._depth = 0
+        self._in_string = False
+
+    @property
+    def finished(self) -> bool:
+        return self.done or self.truncated
+
+    def feed(self, chunk: bytes) -> bool:
+        """Agrega un fragmento; devuelve True cuando ya no hace falta leer más"""
+        if self.finished:
+            return True
+        if self._pos:
+            # Descartar lo ya consumido para que la memoria no crezca con el cuerpo
+            del self._buf[:self._pos]
+            if self._value_start >= 0:
+                self._value_start -= self._pos
+                self._scan_pos -= self._pos
+            self._pos = 0
+        self._buf += chunk
+        if self._state != "raw":
+            self._parse()
+        return self.finished
+
+    def close(self) -> Any:
+        """Cierra el stream y devuelve el resultado parseado"""
+        if self._state == "raw":
+            self.result = loads(bytes(self._buf))
+            self.done = True
+        if not self.finished:
+            raise json.JSONDecodeError("JSON incompleto", "", self._pos)
+        return self.result
+
+    def _parse(self) -> None:
+        while not self.finished:
+            if self._value_start >= 0:
+                end = self._scan_value()
+                if end < 0:
+                    return
+                value = loads(bytes(self._buf[self._value_start:end]))
+                self._pos = end
+                self._value_start = -1
+                self._store(value)
+                continue
+
+            c = self._next_char()
+            if c is None:
+                return
+            state = self._state
+
+            if state == "start":
+                if c != ord("{"):
+                    self._state = "raw"
+                    return
+                self._pos += 1
+                self._state = "key_or_end"
+            elif state == "key_or_end" and c == ord("}"):
+                self._pos += 1
+                self.done = True
+            elif state in ("key_or_end", "key") and c == ord('"'):
+                self._begin_value()
+            elif state == "colon" and c == ord(":"):
+                self._pos += 1
+                self._state = "array" if self._key in self.array_keys else "value"
+            elif state == "array" and c == ord("["):
+                self._pos += 1
+                self._items = []
+                self.result[self._key] = self._items
+                self._state = "item_or_end"
+            elif state in ("value", "array"):
+                self._state = "value"
+                self._begin_value()
+            elif state in ("item_or_end", "item_sep") and c == ord("]"):
+                self._pos += 1
+                self._state = "after_value"
+            elif state == "item_sep" and c == ord(","):
+                self._pos += 1
+                self._state = "item"
+            elif state in ("item_or_end", "item"):
+                if self.max_items is not None and len(self._items) >= self.max_items:
+                    # Hay más elementos de los necesarios: no seguir leyendo
+                    self.truncated = True
+                    return
+                self._begin_value()
+            elif state == "after_value" and c == ord(","):
+                self._pos += 1
+                self._state = "key"
+            elif state == "after_value" and c == ord("}"):
+                self._pos += 1
+                self.done = True
+            else:
+                raise json.JSONDecodeError(f"Carácter inesperado {chr(c)!r}", "", self._pos)
+
+    def _store(self, value: Any) -> None:
+        state = self._state
+        if state in ("key_or_end", "key"):
+            self._key = value
+            self._state = "colon"
+        elif state == "value":
+            self.result[self._key] = value
+            self._state = "after_value"
+        else:
+            self._items.append(value)
+            self._state = "item_sep"
+
+    def _next_char(self) -> Optional[int]:
+        buf = self._buf
+        while self._pos < len(buf) and buf[self._pos] in _WHITESPACE:
+            self._pos += 1
+        if self._pos >= len(buf):
+            return None
+        return buf[self._pos]
+
+    def _begin_value(self) -> None:
+        self._value_start = self._pos
+        self._scan_pos = self._pos
+        self._depth = 0
+        self._in_string = False
+
+    def _scan_value(self) -> int:
+        """Índice final del valor en curso, o -1 si aún no llegó completo"""
+        buf = self._buf
+        if buf[self._value_start] not in b'"[{':
+            m = _SCALAR_END.search(buf, self._value_start)
+            return m.start() if m else -1
+
+        pos, depth, in_string = self._scan_pos, self._depth, self._in_string
+        while True:
+            if in_string:
+                m = _STRING_END.search(buf, pos)
+                if m is None:
+                    pos = len(buf)
+                    break
+                if m.group() == b"\\":
+                    if m.end() >= len(buf):
+                        # Escape partido entre fragmentos: reintentar desde la barra
+                        pos = m.start()
+                        break
+                    pos = m.end() + 1
+                    continue
+                in_string = False
+                pos = m.end()
+                if depth == 0:
+                    return pos
+            else:
+                m = _STRUCTURAL.search(buf, pos)
+                if m is None:
+                    pos = len(buf)
+                    break
+                ch = m.group()
+                pos = m.end()
+                if ch == b'"':
+                    in_string = True
+                elif ch in (b"{", b"["):
+                    depth += 1
+                else:
+                    depth -= 1
+                    if depth == 0:
+                        return pos
+
+        self._scan_pos, self._depth, self._in_string = pos, depth, in_string
+        return -1
+
+
+def preview_json(data: Any, limit: int = 1500) -> str:
+    """Vista previa indentada de ``data`` sin serializar todo el documento"""
+    parts = []
+    size = 0
+    for chunk in _PREVIEW_ENCODER.iterencode(data):
+        parts.append(chunk)
+        size += len(chunk)
+        if size >= limit:
+            break
+    return "".join(parts)[:limit]
@@ -2,17 +2,47 @@ import httpx
 import json
 import logging
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+
+from services.json_stream import StreamingJsonObject, preview_json
+from services.odoo_mirror import contract_list
 
 logger = logging.getLogger(__name__)
 
+MAX_CONTRATOS = 3  # Contratos que se muestran en Telegram
+
 class OdooClient:
     """Cliente para APIs de Odoo - Versión simplificada"""
     
-    def __init__(self):
+    def __init__(self, mirror=None):
         self.timeout = 30.0
+        self.mirror = mirror  # OdooMirror opcional (espejo local SQLite)
+        
+    async def consultar_servicios(self, company_id: str, service_id: str,
+                                  use_mirror: bool = True) -> Dict[str, Any]:
+        """Consulta servicios, respondiendo desde el espejo local si está fresco
+
+        Si la fila del espejo es más antigua que ``odoo_volatile_max_age`` se
+        consulta la API para tener estado y cobranza al día; si la API falla
+        se responde con el espejo marcado como desactualizado.
+        """
+        if not (self.mirror and use_mirror):
+            return await self._consultar_servicios_live(company_id, service_id)
+        
+        cached = self.mirror.get_service(company_id, service_id)
+        if cached and cached["_mirror"]["fresh"]:
+            return cached
         
-    async def consultar_servicios(self, company_id: str, service_id: str) -> Dict[str, Any]:
+        result = await self._consultar_servicios_live(company_id, service_id)
+        if result.get("success"):
+            self.mirror.upsert_services([(company_id, service_id, result)])
+            return result
+        if cached:
+            logger.warning(f"API no disponible para servicio {service_id}, respondiendo desde espejo")
+            return cached
+        return result
+    
+    async def _consultar_servicios_live(self, company_id: str, service_id: str) -> Dict[str, Any]:
         """Consulta servicios en Odoo"""
         from config.settings import settings
         
@@ -55,12 +85,54 @@ class OdooClient:
         except json.JSONDecodeError as e:
             logger.error(f"JSON decode error: {e}")
             return {"error": "Respuesta no es JSON válido", "success": False}
+        except httpx.TransportError as e:
+            logger.error(f"API no disponible consultando servicios: {e!r}")
+            return {"error": str(e) or type(e).__name__, "success": False, "unreachable": True}
         except Exception as e:
             logger.error(f"Error consultando servicios: {e}")
             return {"error": str(e), "success": False}
     
-    async def listar_contratos(self, company_id: str, number_identification: str) -> Dict[str, Any]:
-        """Lista contratos de un cliente"""
+    async def listar_contratos(self, company_id: str, number_identification: str,
+                               max_items: Optional[int] = MAX_CONTRATOS,
+                               use_mirror: bool = True) -> Dict[str, Any]:
+        """Lista contratos, respondiendo desde el espejo local si está fresco
+
+        El espejo guarda lo mismo que devuelve la API: los primeros
+        ``max_items`` contratos y ``has_more`` si la lectura se cortó. Una
+        lista cortada no sirve para pedidos con ``max_items=None``.
+        """
+        if not (self.mirror and use_mirror):
+            return await self._listar_contratos_live(company_id, number_identification, max_items)
+        
+        cached = self.mirror.get_contracts(company_id, number_identification)
+        if cached and cached.get("has_more") and max_items is None:
+            cached = None
+        if cached and cached["_mirror"]["fresh"]:
+            return cached
+        
+        result = await self._listar_contratos_live(company_id, number_identification, max_items)
+        contracts = contract_list(result)
+        if contracts is not None:
+            self.mirror.upsert_contracts([(company_id, number_identification, contracts,
+                                           bool(result.get("has_more")))])
+            return result
+        if cached:
+            logger.warning(f"API no disponible para contratos de {number_identification}, respondiendo desde espejo")
+            return cached
+        return result
+    
+    async def _listar_contratos_live(self, company_id: str, number_identification: str,
+                                     max_items: Optional[int] = MAX_CONTRATOS) -> Dict[str, Any]:
+        """Lista contratos de un cliente
+
+        El cuerpo se parsea a medida que llega y se deja de leer apenas hay
+        más de ``max_items`` contratos (por defecto ``MAX_CONTRATOS``);
+        en ese caso la respuesta incluye ``has_more``. ``None`` lee todo.
+        
+        Al cortar la lectura no se ven las claves posteriores a la lista: si
+        ``success`` no llegó antes, se deduce de lo parseado (sin ``error``
+        y con una lista de contratos).
+        """
         from config.settings import settings
         
         url = f"{settings.odoo_api_base_url}/Contact/api/v1/DetailContract"
@@ -76,11 +148,28 @@ class OdooClient:
             "number_identification": number_identification
         }
         
+        parser = StreamingJsonObject(array_keys=("data", "contracts"), max_items=max_items)
+        
         try:
             async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(url, headers=headers, json=data)
-                response.raise_for_status()
-                return response.json()
+                async with client.stream("POST", url, headers=headers, json=data) as response:
+                    response.raise_for_status()
+                    async for chunk in response.aiter_bytes():
+                        if parser.feed(chunk):
+                            break
+                result = parser.close()
+                
+                if parser.truncated:
+                    # Los campos posteriores a la lista no se leyeron
+                    if "success" not in result:
+                        result["success"] = "error" not in result and contract_list(result) is not None
+                    result["has_more"] = True
+                    logger.info(f"Contratos de {number_identification}: lectura cortada tras {max_items}")
+                    
+                return result
+        except httpx.TransportError as e:
+            logger.error(f"API no disponible listando contratos: {e!r}")
+            return {"error": str(e) or type(e).__name__, "success": False, "unreachable": True}
         except Exception as e:
             logger.error(f"Error listando contratos: {e}")
             return {"error": str(e), "success": False}
@@ -124,17 +213,30 @@ class OdooClient:
         
         try:
             if query_type == "servicio":
-                return self._format_service(data)
+                text = self._format_service(data)
             elif query_type == "contrato":
-                return self._format_contract(data)
+                text = self._format_contract(data)
             elif query_type == "deuda":
-                return self._format_debt(data)
+                text = self._format_debt(data)
             else:
                 # Formato genérico
-                return f"📊 *Datos recibidos:*\n```json\n{json.dumps(data, indent=2, ensure_ascii=False)[:1500]}\n```"
+                return f"📊 *Datos recibidos:*\n```json\n{preview_json(data, 1500)}\n```"
+            
+            if "_mirror" in data:
+                text += self._format_freshness(data["_mirror"])
+            return text
         except Exception as e:
             return f"✅ *Consulta exitosa*\n\n`Datos crudos: {str(data)[:300]}...`"
     
+    def _format_freshness(self, mirror: Dict[str, Any]) -> str:
+        """Indicador de frescura para respuestas del espejo local"""
+        minutes = int(mirror["age"] // 60)
+        line = f"\n\n🗄️ _Espejo local, actualizado hace {minutes} min_"
+        if not mirror["fresh"]:
+            fields = ", ".join(f"`{f}`" for f in mirror["volatile_fields"])
+            line += f"\n⚠️ API no disponible, pueden estar desactualizados: {fields}"
+        return line
+    
     def _format_service(self, data: Dict[str, Any]) -> str:
         """Formatea respuesta de servicio - VERSIÓN CORREGIDA"""
         try:
@@ -196,7 +298,7 @@ class OdooClient:
             if isinstance(contracts, list):
                 response = ["📄 *Contratos Encontrados*", ""]
                 
-                for i, contract in enumerate(contracts[:3], 1):  # Máximo 3
+                for i, contract in enumerate(contracts[:MAX_CONTRATOS], 1):
                     if isinstance(contract, dict):
                         response.append(f"*Contrato {i}:*")
                         # Mostrar campos comunes
@@ -205,8 +307,10 @@ class OdooClient:
                                 response.append(f"  • *{key}:* `{contract[key]}`")
                         response.append("")
                 
-                if len(contracts) > 3:
-                    response.append(f"*... y {len(contracts) - 3} más*")
+                if len(contracts) > MAX_CONTRATOS:
+                    response.append(f"*... y {len(contracts) - MAX_CONTRATOS} más*")
+                elif data.get("has_more"):
+                    response.append("*... y más contratos*")
                 
                 return "\n".join(response)
             else:
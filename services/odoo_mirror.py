@@ -0,0 +1,305 @@
+import json
+import sqlite3
+import time
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from services.json_stream import loads
+
+logger = logging.getLogger(__name__)
+
+# Campos que cambian seguido: solo se confían al espejo si la fila es reciente
+VOLATILE_SERVICE_FIELDS = ("status_service", "collection")
+VOLATILE_CONTRACT_FIELDS = ("status",)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS services (
+    company_id TEXT NOT NULL,
+    service_id TEXT NOT NULL,
+    number_identification TEXT,
+    data TEXT NOT NULL,
+    synced_at REAL NOT NULL,
+    attempted_at REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    read_at REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (company_id, service_id)
+);
+CREATE INDEX IF NOT EXISTS idx_services_service_id ON services (service_id);
+CREATE INDEX IF NOT EXISTS idx_services_number_identification ON services (number_identification);
+CREATE INDEX IF NOT EXISTS idx_services_attempted_at ON services (attempted_at);
+
+CREATE TABLE IF NOT EXISTS contract_sets (
+    company_id TEXT NOT NULL,
+    number_identification TEXT NOT NULL,
+    has_more INTEGER NOT NULL DEFAULT 0,
+    synced_at REAL NOT NULL,
+    attempted_at REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    read_at REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (company_id, number_identification)
+);
+CREATE INDEX IF NOT EXISTS idx_contract_sets_attempted_at ON contract_sets (attempted_at);
+
+CREATE TABLE IF NOT EXISTS contracts (
+    company_id TEXT NOT NULL,
+    number_identification TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (company_id, number_identification, position)
+);
+CREATE INDEX IF NOT EXISTS idx_contracts_number_identification ON contracts (number_identification);
+"""
+
+
+
+def contract_list(result: Any) -> Optional[list]:
+    """Lista de contratos de una respuesta de DetailContract, si la hay"""
+    if not isinstance(result, dict) or "error" in result:
+        return None
+    contracts = result.get("data", result.get("contracts"))
+    return contracts if isinstance(contracts, list) else None
+
+
+class OdooMirror:
+    """Espejo local en SQLite de servicios y contratos de Odoo
+
+    Guarda la última respuesta de cada servicio y los primeros contratos de
+    cada cliente consultado por un usuario. Dentro de
+    ``odoo_volatile_max_age`` la fila responde sola; después la consulta del
+    usuario va a la API (estado y cobranza) y el espejo queda como respaldo
+    si la API falla. El job periódico (``sync``) solo mantiene los datos
+    estables al día, refrescando filas más viejas que
+    ``odoo_stable_max_age``, y descarta las que nadie leyó en
+    ``odoo_mirror_retention_days``.
+    """
+
+    def __init__(self, db_path: Optional[Path] = None):
+        from config.settings import settings
+
+        self.db_path = Path(db_path or settings.data_dir / "odoo_mirror.db")
+        self.sync_batch = settings.odoo_sync_batch
+        self.max_failures = settings.odoo_sync_max_failures
+        self.volatile_max_age = settings.odoo_volatile_max_age
+        self.stable_max_age = settings.odoo_stable_max_age
+        self.retention = settings.odoo_mirror_retention_days * 86400
+
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        logger.info(f"🗄️ Espejo Odoo en {self.db_path}")
+
+    def close(self):
+        self.conn.close()
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+    def _freshness(self, synced_at: float, volatile: Tuple[str, ...]) -> Dict[str, Any]:
+        age = time.time() - synced_at
+        return {
+            "synced_at": synced_at,
+            "age": age,
+            "fresh": age < self.volatile_max_age,
+            "volatile_fields": list(volatile),
+        }
+
+    def get_service(self, company_id: str, service_id: str) -> Optional[Dict[str, Any]]:
+        """Respuesta guardada de un servicio, con indicador ``_mirror``"""
+        row = self.conn.execute(
+            "SELECT data, synced_at FROM services WHERE company_id = ? AND service_id = ?",
+            (company_id, service_id),
+        ).fetchone()
+        if row is None:
+            return None
+        with self.conn:
+            self.conn.execute(
+                "UPDATE services SET read_at = ? WHERE company_id = ? AND service_id = ?",
+                (time.time(), company_id, service_id),
+            )
+        result = loads(row["data"])
+        result["_mirror"] = self._freshness(row["synced_at"], VOLATILE_SERVICE_FIELDS)
+        return result
+
+    def get_contracts(self, company_id: str, number_identification: str) -> Optional[Dict[str, Any]]:
+        """Contratos guardados (con ``has_more`` si la lista se cortó) e indicador ``_mirror``"""
+        row = self.conn.execute(
+            "SELECT has_more, synced_at FROM contract_sets WHERE company_id = ? AND number_identification = ?",
+            (company_id, number_identification),
+        ).fetchone()
+        if row is None:
+            return None
+        with self.conn:
+            self.conn.execute(
+                "UPDATE contract_sets SET read_at = ? WHERE company_id = ? AND number_identification = ?",
+                (time.time(), company_id, number_identification),
+            )
+        contracts = [
+            loads(r["data"])
+            for r in self.conn.execute(
+                "SELECT data FROM contracts WHERE company_id = ? AND number_identification = ? ORDER BY position",
+                (company_id, number_identification),
+            )
+        ]
+        result = {
+            "success": True,
+            "data": contracts,
+            "_mirror": self._freshness(row["synced_at"], VOLATILE_CONTRACT_FIELDS),
+        }
+        if row["has_more"]:
+            result["has_more"] = True
+        return result
+
+    # ------------------------------------------------------------------
+    # Escritura (siempre en bloque y dentro de una transacción)
+    #
+    # read_at solo se fija al insertar; después lo actualizan las lecturas,
+    # así el sync no mantiene vivas filas que ningún usuario consulta.
+    # ------------------------------------------------------------------
+    def upsert_services(self, rows: Iterable[Tuple[str, str, Dict[str, Any]]]):
+        """Guarda respuestas de servicio: (company_id, service_id, respuesta)"""
+        now = time.time()
+        params = []
+        for company_id, service_id, result in rows:
+            result = {k: v for k, v in result.items() if k != "_mirror"}
+            detail = result.get("result")
+            number_identification = detail.get("number_identification") if isinstance(detail, dict) else None
+            params.append((company_id, service_id, number_identification,
+                           json.dumps(result, ensure_ascii=False), now, now, now))
+        if not params:
+            return
+        with self.conn:
+            self.conn.executemany(
+                """INSERT INTO services (company_id, service_id, number_identification, data,
+                                         synced_at, attempted_at, read_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (company_id, service_id) DO UPDATE SET
+                       number_identification = excluded.number_identification,
+                       data = excluded.data,
+                       synced_at = excluded.synced_at,
+                       attempted_at = excluded.attempted_at,
+                       last_error = NULL""",
+                params,
+            )
+
+    def upsert_contracts(self, rows: Iterable[Tuple[str, str, List[Any], bool]]):
+        """Reemplaza los contratos guardados: (company_id, number_identification, contratos, has_more)"""
+        now = time.time()
+        rows = list(rows)
+        if not rows:
+            return
+        with self.conn:
+            for company_id, number_identification, contracts, _ in rows:
+                self.conn.execute(
+                    "DELETE FROM contracts WHERE company_id = ? AND number_identification = ?",
+                    (company_id, number_identification),
+                )
+                self.conn.executemany(
+                    "INSERT INTO contracts (company_id, number_identification, position, data) VALUES (?, ?, ?, ?)",
+                    [(company_id, number_identification, i, json.dumps(c, ensure_ascii=False))
+                     for i, c in enumerate(contracts)],
+                )
+            self.conn.executemany(
+                """INSERT INTO contract_sets (company_id, number_identification, has_more,
+                                              synced_at, attempted_at, read_at)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (company_id, number_identification) DO UPDATE SET
+                       has_more = excluded.has_more,
+                       synced_at = excluded.synced_at,
+                       attempted_at = excluded.attempted_at,
+                       last_error = NULL""",
+                [(company_id, number_identification, int(has_more), now, now, now)
+                 for company_id, number_identification, _, has_more in rows],
+            )
+
+    def record_failures(self, table: str, key: str, rows: Iterable[Tuple[str, str, str]]):
+        """Marca intentos fallidos (company_id, id, error) para no repetirlos en cada sync"""
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                f"UPDATE {table} SET attempted_at = ?, last_error = ? WHERE company_id = ? AND {key} = ?",
+                [(now, error[:500], company_id, value) for company_id, value, error in rows],
+            )
+
+    def evict(self) -> int:
+        """Elimina las filas que ningún usuario leyó dentro del período de retención"""
+        cutoff = time.time() - self.retention
+        with self.conn:
+            removed = self.conn.execute("DELETE FROM services WHERE read_at < ?", (cutoff,)).rowcount
+            self.conn.execute(
+                """DELETE FROM contracts WHERE (company_id, number_identification) IN (
+                       SELECT company_id, number_identification FROM contract_sets WHERE read_at < ?)""",
+                (cutoff,),
+            )
+            removed += self.conn.execute("DELETE FROM contract_sets WHERE read_at < ?", (cutoff,)).rowcount
+        return removed
+
+    # ------------------------------------------------------------------
+    # Sincronización
+    # ------------------------------------------------------------------
+    def _stale(self, table: str, key: str) -> List[Tuple[str, str]]:
+        # Filas con datos estables vencidos; los fallidos esperan lo mismo y
+        # pasan al final de la cola (orden por attempted_at)
+        cutoff = time.time() - self.stable_max_age
+        rows = self.conn.execute(
+            f"""SELECT company_id, {key} FROM {table}
+                WHERE synced_at < ? AND attempted_at < ?
+                ORDER BY attempted_at LIMIT ?""",
+            (cutoff, cutoff, self.sync_batch),
+        ).fetchall()
+        return [(r[0], r[1]) for r in rows]
+
+    async def sync(self, client) -> Dict[str, int]:
+        """Refresca las filas vencidas (delta) contra la API de Odoo
+
+        Si la API no responde ``odoo_sync_max_failures`` veces seguidas
+        (conexión o timeout) se corta el lote y el próximo intervalo reintenta.
+        """
+        evicted = self.evict()
+        stats = {"services": 0, "contracts": 0, "failed": 0, "evicted": evicted, "aborted": False}
+        consecutive = 0
+
+        def register(result: Dict[str, Any]) -> bool:
+            """Cuenta fallas de conexión seguidas; True si hay que cortar el lote"""
+            nonlocal consecutive
+            consecutive = consecutive + 1 if result.get("unreachable") else 0
+            return consecutive >= self.max_failures
+
+        services, failed = [], []
+        for company_id, service_id in self._stale("services", "service_id"):
+            result = await client.consultar_servicios(company_id, service_id, use_mirror=False)
+            if result.get("success"):
+                services.append((company_id, service_id, result))
+            else:
+                failed.append((company_id, service_id, str(result.get("error", "Error desconocido"))))
+            if register(result):
+                stats["aborted"] = True
+                break
+        self.upsert_services(services)
+        self.record_failures("services", "service_id", failed)
+
+        contracts, failed_contracts = [], []
+        if not stats["aborted"]:
+            for company_id, number_identification in self._stale("contract_sets", "number_identification"):
+                # Mismo corte que ve el usuario: no bajar listas completas
+                result = await client.listar_contratos(company_id, number_identification, use_mirror=False)
+                items = contract_list(result)
+                if items is not None:
+                    contracts.append((company_id, number_identification, items, bool(result.get("has_more"))))
+                else:
+                    error = result.get("error", "Error desconocido") if isinstance(result, dict) else "Respuesta inválida"
+                    failed_contracts.append((company_id, number_identification, str(error)))
+                if isinstance(result, dict) and register(result):
+                    stats["aborted"] = True
+                    break
+        self.upsert_contracts(contracts)
+        self.record_failures("contract_sets", "number_identification", failed_contracts)
+
+        if stats["aborted"]:
+            logger.warning(f"🗄️ Sync cortado: API sin respuesta {self.max_failures} veces seguidas")
+        stats["services"] = len(services)
+        stats["contracts"] = len(contracts)
+        stats["failed"] = len(failed) + len(failed_contracts)
+        return stats